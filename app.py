@@ -1,13 +1,15 @@
 import streamlit as st
-import re
 import json
-from urllib.parse import urljoin, urlparse
+import codecs
+import asyncio
+import zlib
+from urllib.parse import urljoin
 import httpx
-from bs4 import BeautifulSoup
+from lxml import etree
 import pandas as pd
-from io import StringIO
+from io import BytesIO, StringIO
 import time
-from collections import Counter
+from collections import Counter, defaultdict
 
 st.set_page_config(
     page_title="LLM Product Page Auditor",
@@ -37,93 +39,199 @@ if 'categories_custom' not in st.session_state:
     st.session_state.categories_custom = {}
 if 'scan_done' not in st.session_state:
     st.session_state.scan_done = False
+if 'url_picks' not in st.session_state:
+    # Sélections en cours par catégorie, conservées d'une page de résultats à l'autre
+    st.session_state.url_picks = {}
+if 'urls_lower' not in st.session_state:
+    # Index des URLs en minuscules, parallèle à all_urls, pour les recherches insensibles à la casse
+    st.session_state.urls_lower = [u.lower() for u in st.session_state.all_urls]
 
-SITEMAP_RE = re.compile(r'<loc>(.*?)</loc>', re.IGNORECASE)
+USER_AGENT = "LLM-Product-Auditor/1.0"
+# Nombre max de sous-sitemaps téléchargés en parallèle
+SITEMAP_CONCURRENCY = 16
+# Taille max d'un sitemap selon sitemaps.org : au-delà, on arrête la lecture
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+# Nombre d'URLs proposées par page dans les listes de sélection
+URLS_PER_PAGE = 100
+# Segments d'URL trop génériques pour devenir une catégorie
+GENERIC_SEGMENTS = frozenset({'content', 'product', 'produit', 'item', 'article'})
 
-def clean_url(url):
-    """Nettoie les balises XML comme <![CDATA[ et ]]>"""
-    return url.replace('<![CDATA[', '').replace(']]>', '').strip()
+class PartialSitemapError(Exception):
+    """Sitemaps en échec ou tronqués : les URLs récupérées sont jointes mais ne doivent pas être mises en cache"""
+    def __init__(self, urls: list[str], failed: int, truncated: int = 0):
+        reasons = []
+        if failed:
+            reasons.append(f"{failed} sous-sitemap(s) inaccessible(s)")
+        if truncated:
+            reasons.append(f"{truncated} sitemap(s) tronqué(s) à {MAX_SITEMAP_BYTES // (1024 * 1024)} Mo")
+        super().__init__(", ".join(reasons))
+        self.urls = urls
+        self.failed = failed
+        self.truncated = truncated
+
+def make_client(user_agent: str = USER_AGENT) -> httpx.AsyncClient:
+    """Client HTTP/2 unique, avec pool de connexions keep-alive partagé entre les requêtes"""
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=20,
+        follow_redirects=True,
+        headers={"User-Agent": user_agent},
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=32, keepalive_expiry=30)
+    )
+
+async def fetch_sitemap_locs(client: httpx.AsyncClient, url: str) -> tuple[list[str], bool]:
+    """
+    Lit les <loc> d'un sitemap au fil du téléchargement (le parseur gère les CDATA).
+    Retourne les URLs et un indicateur de troncature à MAX_SITEMAP_BYTES.
+    """
+    parser = etree.XMLPullParser(events=("end",), tag="{*}loc", recover=True)
+    locs = []
+    truncated = False
+    
+    async with client.stream("GET", url) as r:
+        # Page d'erreur (503, 429, 403...) : on lève pour que l'échec ne soit pas mis en cache.
+        # Le Content-Type n'est pas fiable (sitemaps dynamiques souvent servis en text/html),
+        # le parseur tolérant tranche.
+        r.raise_for_status()
+        received = 0
+        inflater = None
+        async for chunk in r.aiter_bytes():
+            # Sitemap .xml.gz servi tel quel (sans Content-Encoding) : décompression à la volée
+            if inflater is None and received == 0 and chunk.startswith(b"\x1f\x8b"):
+                inflater = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            if inflater is not None:
+                # Borne la sortie : un bloc compressé peut gonfler ~1000x avant le contrôle de taille
+                chunk = inflater.decompress(chunk, MAX_SITEMAP_BYTES - received + 1)
+            if received + len(chunk) > MAX_SITEMAP_BYTES:
+                # On lit jusqu'à la limite puis on s'arrête : les <loc> complets sont conservés
+                chunk = chunk[:MAX_SITEMAP_BYTES - received]
+                truncated = True
+            received += len(chunk)
+            parser.feed(chunk)
+            for _, elem in parser.read_events():
+                loc = (elem.text or "").strip()
+                if loc:
+                    locs.append(loc)
+                # Libérer les <url>/<sitemap> déjà lus pour garder une mémoire constante
+                entry = elem.getparent()
+                elem.clear()
+                if entry is not None and entry.getparent() is not None:
+                    while entry.getprevious() is not None:
+                        del entry.getparent()[0]
+            if truncated:
+                break
+    
+    try:
+        parser.close()
+    except etree.XMLSyntaxError:
+        pass
+    return locs, truncated
 
 async def discover_urls(root_url: str) -> list[str]:
-    """Découvre toutes les URLs via sitemap.xml"""
+    """
+    Découvre toutes les URLs via sitemap.xml.
+    Lève une exception si le sitemap racine est inaccessible, et PartialSitemapError
+    (avec les URLs obtenues) si des sous-sitemaps ont échoué ou si un sitemap a été tronqué.
+    """
     sitemap_url = urljoin(root_url.rstrip("/") + "/", "sitemap.xml")
     
-    async with httpx.AsyncClient(
-        timeout=20,
-        follow_redirects=True,
-        headers={"User-Agent": "LLM-Product-Auditor/1.0"}
-    ) as client:
-        try:
-            xml = (await client.get(sitemap_url, timeout=20)).text
-            locs = SITEMAP_RE.findall(xml)
-            locs = [clean_url(loc) for loc in locs]
-            urls = []
-            
-            # Gestion des sitemap index
-            sitemap_files = [loc for loc in locs if loc.endswith(".xml") and "sitemap" in loc.lower()]
-            
-            if sitemap_files:
-                for sitemap_file in sitemap_files:
-                    try:
-                        subxml = (await client.get(sitemap_file, timeout=20)).text
-                        sub_locs = SITEMAP_RE.findall(subxml)
-                        sub_locs = [clean_url(loc) for loc in sub_locs]
-                        urls.extend(sub_locs)
-                    except Exception:
-                        pass
-            else:
-                urls = locs
+    async with make_client() as client:
+        locs, root_truncated = await fetch_sitemap_locs(client, sitemap_url)
+        truncated = int(root_truncated)
+        urls = []
+        
+        # Gestion des sitemap index
+        sitemap_files = [loc for loc in locs if loc.endswith((".xml", ".xml.gz")) and "sitemap" in loc.lower()]
+        
+        if sitemap_files:
+            sem = asyncio.Semaphore(SITEMAP_CONCURRENCY)
             
-            return sorted(set(urls))
+            async def fetch_sub(sitemap_file):
+                async with sem:
+                    return await fetch_sitemap_locs(client, sitemap_file)
             
-        except Exception as e:
-            st.error(f"Erreur lors du scan du sitemap : {str(e)}")
-            return []
+            results = await asyncio.gather(*(fetch_sub(f) for f in sitemap_files), return_exceptions=True)
+            failed = 0
+            for result in results:
+                if isinstance(result, BaseException):
+                    failed += 1
+                else:
+                    sub_locs, sub_truncated = result
+                    urls.extend(sub_locs)
+                    truncated += sub_truncated
+        else:
+            failed = 0
+            urls = locs
+        
+        # Dédoublonnage en O(n) qui conserve l'ordre du sitemap
+        urls = list(dict.fromkeys(urls))
+        if failed or truncated:
+            raise PartialSitemapError(urls, failed, truncated)
+        return urls
+
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def discover_urls_cached(root_url: str) -> list[str]:
+    """Scan du sitemap mis en cache : un rerun ou un nouveau clic ne retélécharge rien"""
+    return asyncio.run(discover_urls(root_url))
+
+def path_segments(url: str) -> list[str]:
+    """Segments non vides du chemin, extraits par découpage direct (sans urlparse), query et fragment exclus"""
+    rest = url.partition('://')[2].split('?', 1)[0].split('#', 1)[0]
+    return [s for s in rest.partition('/')[2].split('/') if s]
+
+def group_urls_by_depth(urls: list[str]) -> dict:
+    """Répartit les URLs en courtes (1-2 segments), moyennes (3) et longues (4+) en une seule passe"""
+    groups = {"short": [], "medium": [], "long": []}
+    short_urls, medium_urls, long_urls = groups["short"], groups["medium"], groups["long"]
+    
+    for url in urls:
+        nb = len(path_segments(url))
+        if nb <= 2:
+            short_urls.append(url)
+        elif nb == 3:
+            medium_urls.append(url)
+        else:
+            long_urls.append(url)
+    
+    return groups
 
 def auto_suggest_categories(urls: list[str]) -> dict:
     """
     Auto-suggestion de catégories basée sur l'analyse des URLs.
     Retourne un dict {nom_categorie: [liste_urls]}
     """
-    suggestions = {}
-    
-    # Analyser les patterns d'URLs
-    url_patterns = {}
+    # Analyser les patterns d'URLs en une seule passe
+    url_patterns = defaultdict(list)
     
     for url in urls:
-        parsed = urlparse(url)
-        path = parsed.path.strip('/')
-        segments = [s for s in path.split('/') if s]
+        segments = path_segments(url)
         
         # Compter combien de segments
         nb_segments = len(segments)
         
         # URLs courtes (1-2 segments) = potentiellement des catégories
-        if nb_segments <= 2 and nb_segments >= 1:
-            first_seg = segments[0]
-            # Créer une catégorie si ce segment apparaît souvent
-            if first_seg not in url_patterns:
-                url_patterns[first_seg] = []
-            url_patterns[first_seg].append(url)
+        if 1 <= nb_segments <= 2:
+            url_patterns[segments[0]].append(url)
         
         # URLs longues (3+ segments) = potentiellement des produits
         elif nb_segments >= 3:
-            # Chercher un segment qui ressemble à une catégorie
+            # Premier segment qui ressemble à une catégorie (ni numérique, ni générique)
             for seg in segments:
-                if len(seg) > 3 and not seg.isdigit():
-                    # Ignorer les segments génériques
-                    if seg.lower() not in ['content', 'product', 'produit', 'item', 'article']:
-                        if seg not in url_patterns:
-                            url_patterns[seg] = []
-                        url_patterns[seg].append(url)
-                        break
+                if len(seg) > 3 and not seg.isdigit() and seg.lower() not in GENERIC_SEGMENTS:
+                    url_patterns[seg].append(url)
+                    break
     
     # Créer les suggestions (seulement celles avec 2+ URLs)
-    for category, category_urls in url_patterns.items():
-        if len(category_urls) >= 2:
-            suggestions[category] = category_urls
-    
-    return suggestions
+    return {category: category_urls for category, category_urls in url_patterns.items() if len(category_urls) >= 2}
+
+def search_urls(term: str) -> list[str]:
+    """URLs contenant `term` (insensible à la casse), via l'index minuscule calculé au scan"""
+    term = term.lower()
+    return [u for u, u_lower in zip(st.session_state.all_urls, st.session_state.urls_lower) if term in u_lower]
+
+# Répartition par profondeur, recalculée uniquement à chaque nouveau scan
+if 'url_groups' not in st.session_state:
+    st.session_state.url_groups = group_urls_by_depth(st.session_state.all_urls)
 
 # ÉTAPE 1 : SCAN DU SITEMAP
 st.markdown("## 📡 Étape 1 : Scanner le sitemap")
@@ -137,16 +245,32 @@ root_url = st.text_input(
 if st.button("🚀 Scanner le sitemap complet", type="primary"):
     if root_url:
         with st.spinner("🔍 Scan du sitemap en cours..."):
-            import asyncio
-            urls = asyncio.run(discover_urls(root_url))
+            scan_warning = None
+            try:
+                urls = discover_urls_cached(root_url)
+            except PartialSitemapError as e:
+                # Résultat incomplet : utilisé pour cette session mais pas mis en cache
+                scan_warning = f"⚠️ Scan incomplet : {str(e)}"
+                if e.failed:
+                    scan_warning += ", relancez le scan pour réessayer"
+                urls = e.urls
+            except Exception as e:
+                # Les exceptions ne sont pas mises en cache : un nouvel essai relance le scan
+                st.error(f"Erreur lors du scan du sitemap : {str(e)}")
+                urls = []
             
             if urls:
                 st.session_state.all_urls = urls
+                st.session_state.urls_lower = [u.lower() for u in urls]
+                st.session_state.url_groups = group_urls_by_depth(urls)
                 st.session_state.scan_done = True
+                # Avertissement lié à ces résultats, conservé pour rester visible après le st.rerun()
+                st.session_state.scan_warning = scan_warning
                 
                 # Auto-suggestion de catégories
                 suggested = auto_suggest_categories(urls)
                 st.session_state.categories_custom = suggested
+                st.session_state.url_picks = {}
                 
                 st.success(f"✅ {len(urls)} URLs découvertes !")
                 st.info(f"💡 {len(suggested)} catégories auto-détectées (vous pouvez les modifier ci-dessous)")
@@ -160,24 +284,13 @@ if st.button("🚀 Scanner le sitemap complet", type="primary"):
 if st.session_state.scan_done and st.session_state.all_urls:
     st.markdown("---")
     st.markdown(f"### ✅ {len(st.session_state.all_urls)} URLs découvertes")
+    if st.session_state.get('scan_warning'):
+        st.warning(st.session_state.scan_warning)
     
     with st.expander("📋 Voir toutes les URLs", expanded=False):
-        # Grouper par nombre de segments
-        short_urls = []
-        medium_urls = []
-        long_urls = []
-        
-        for url in st.session_state.all_urls:
-            parsed = urlparse(url)
-            segments = [s for s in parsed.path.strip('/').split('/') if s]
-            nb = len(segments)
-            
-            if nb <= 2:
-                short_urls.append(url)
-            elif nb == 3:
-                medium_urls.append(url)
-            else:
-                long_urls.append(url)
+        # Grouper par nombre de segments (calculé une fois au scan)
+        groups = st.session_state.url_groups
+        short_urls, medium_urls, long_urls = groups["short"], groups["medium"], groups["long"]
         
         tab1, tab2, tab3 = st.tabs([
             f"📁 URLs courtes ({len(short_urls)})",
@@ -187,25 +300,123 @@ if st.session_state.scan_done and st.session_state.all_urls:
         
         with tab1:
             st.caption("URLs avec 1-2 segments (probablement des pages catégories)")
-            for url in short_urls[:50]:
-                st.code(url, language=None)
+            if short_urls:
+                st.code("\n".join(short_urls[:50]), language=None)
             if len(short_urls) > 50:
                 st.caption(f"... et {len(short_urls) - 50} autres")
         
         with tab2:
             st.caption("URLs avec 3 segments")
-            for url in medium_urls[:50]:
-                st.code(url, language=None)
+            if medium_urls:
+                st.code("\n".join(medium_urls[:50]), language=None)
             if len(medium_urls) > 50:
                 st.caption(f"... et {len(medium_urls) - 50} autres")
         
         with tab3:
             st.caption("URLs avec 4+ segments (probablement des pages produits)")
-            for url in long_urls[:50]:
-                st.code(url, language=None)
+            if long_urls:
+                st.code("\n".join(long_urls[:50]), language=None)
             if len(long_urls) > 50:
                 st.caption(f"... et {len(long_urls) - 50} autres")
 
+def merge_page_picks(cat_name: str, select_key: str, page_urls: list[str]):
+    """Remplace la sélection de la page courante dans les URLs retenues de la catégorie."""
+    page_set = set(page_urls)
+    kept = [u for u in st.session_state.url_picks.get(cat_name, []) if u not in page_set]
+    st.session_state.url_picks[cat_name] = kept + st.session_state[select_key]
+
+@st.fragment
+def render_category_editor(cat_name: str):
+    """
+    Éditeur d'une catégorie, isolé dans un fragment : une saisie dans cette catégorie
+    ne réexécute que ce bloc, pas les autres catégories ni le reste de la page.
+    Les actions qui modifient les catégories relancent toute l'app via st.rerun().
+    """
+    cat_urls = st.session_state.categories_custom[cat_name]
+    
+    with st.expander(f"📁 {cat_name} ({len(cat_urls)} URLs)", expanded=False):
+        col1, col2 = st.columns([3, 1])
+        
+        with col1:
+            # Afficher les URLs de cette catégorie
+            st.caption("URLs dans cette catégorie :")
+            if cat_urls:
+                st.text("\n".join(cat_urls[:10]))
+            if len(cat_urls) > 10:
+                st.caption(f"... et {len(cat_urls) - 10} autres URLs")
+        
+        with col2:
+            # Actions
+            if st.button(f"🗑️ Supprimer", key=f"del_{cat_name}"):
+                del st.session_state.categories_custom[cat_name]
+                st.success(f"Catégorie '{cat_name}' supprimée")
+                st.rerun()
+            
+            # Renommer
+            new_name = st.text_input(
+                "Renommer",
+                value=cat_name,
+                key=f"rename_{cat_name}"
+            )
+            if new_name != cat_name and st.button(f"✏️ Valider", key=f"rename_btn_{cat_name}"):
+                st.session_state.categories_custom[new_name] = st.session_state.categories_custom[cat_name]
+                del st.session_state.categories_custom[cat_name]
+                st.success(f"Renommée en '{new_name}'")
+                st.rerun()
+        
+        # Ajouter/retirer des URLs manuellement
+        st.markdown("**Ajouter des URLs manuellement :**")
+        
+        # Filtre de recherche
+        search = st.text_input(
+            "Rechercher des URLs à ajouter",
+            placeholder="Tapez un mot-clé pour filtrer...",
+            key=f"search_{cat_name}"
+        )
+        
+        # URLs disponibles (pas encore dans cette catégorie), filtrées en une seule passe
+        cat_urls_set = set(cat_urls)
+        available_urls = [u for u in search_urls(search) if u not in cat_urls_set]
+        
+        # Sélection accumulée sur toutes les pages, gardée hors du widget : ses options
+        # (la page courante) restent dans un ordre stable
+        picks = [u for u in st.session_state.url_picks.get(cat_name, []) if u not in cat_urls_set]
+        
+        if available_urls or picks:
+            # Pagination : seules les URLs de la page courante sont envoyées au widget
+            nb_pages = max(1, (len(available_urls) - 1) // URLS_PER_PAGE + 1)
+            page = 1
+            if nb_pages > 1:
+                page = st.number_input(
+                    f"Page (sur {nb_pages})",
+                    min_value=1,
+                    max_value=nb_pages,
+                    value=1,
+                    key=f"page_{cat_name}"
+                )
+            start = (page - 1) * URLS_PER_PAGE
+            page_urls = available_urls[start:start + URLS_PER_PAGE]
+            picks_set = set(picks)
+            
+            select_key = f"add_urls_{cat_name}_{page}"
+            st.multiselect(
+                f"Sélectionnez des URLs à ajouter ({len(available_urls)} disponibles, sélection conservée entre les pages)",
+                options=page_urls,
+                default=[u for u in page_urls if u in picks_set],
+                key=select_key,
+                on_change=merge_page_picks,
+                args=(cat_name, select_key, page_urls)
+            )
+            
+            if picks and st.button(f"➕ Ajouter {len(picks)} URL(s)", key=f"add_btn_{cat_name}"):
+                st.session_state.categories_custom[cat_name].extend(picks)
+                st.session_state.url_picks.pop(cat_name, None)
+                st.session_state.pop(select_key, None)
+                st.success(f"{len(picks)} URL(s) ajoutée(s) à '{cat_name}'")
+                st.rerun()
+        else:
+            st.info("Toutes les URLs sont déjà dans une catégorie ou aucune ne correspond à la recherche")
+
 # ÉTAPE 2 : GESTION DES CATÉGORIES
 if st.session_state.scan_done:
     st.markdown("---")
@@ -225,68 +436,7 @@ if st.session_state.scan_done:
         else:
             # Afficher chaque catégorie
             for cat_name in list(st.session_state.categories_custom.keys()):
-                cat_urls = st.session_state.categories_custom[cat_name]
-                
-                with st.expander(f"📁 {cat_name} ({len(cat_urls)} URLs)", expanded=False):
-                    col1, col2 = st.columns([3, 1])
-                    
-                    with col1:
-                        # Afficher les URLs de cette catégorie
-                        st.caption("URLs dans cette catégorie :")
-                        for url in cat_urls[:10]:
-                            st.text(url)
-                        if len(cat_urls) > 10:
-                            st.caption(f"... et {len(cat_urls) - 10} autres URLs")
-                    
-                    with col2:
-                        # Actions
-                        if st.button(f"🗑️ Supprimer", key=f"del_{cat_name}"):
-                            del st.session_state.categories_custom[cat_name]
-                            st.success(f"Catégorie '{cat_name}' supprimée")
-                            st.rerun()
-                        
-                        # Renommer
-                        new_name = st.text_input(
-                            "Renommer",
-                            value=cat_name,
-                            key=f"rename_{cat_name}"
-                        )
-                        if new_name != cat_name and st.button(f"✏️ Valider", key=f"rename_btn_{cat_name}"):
-                            st.session_state.categories_custom[new_name] = st.session_state.categories_custom[cat_name]
-                            del st.session_state.categories_custom[cat_name]
-                            st.success(f"Renommée en '{new_name}'")
-                            st.rerun()
-                    
-                    # Ajouter/retirer des URLs manuellement
-                    st.markdown("**Ajouter des URLs manuellement :**")
-                    
-                    # Filtre de recherche
-                    search = st.text_input(
-                        "Rechercher des URLs à ajouter",
-                        placeholder="Tapez un mot-clé pour filtrer...",
-                        key=f"search_{cat_name}"
-                    )
-                    
-                    # URLs disponibles (pas encore dans cette catégorie)
-                    available_urls = [u for u in st.session_state.all_urls if u not in cat_urls]
-                    
-                    if search:
-                        available_urls = [u for u in available_urls if search.lower() in u.lower()]
-                    
-                    # Multiselect pour ajouter des URLs
-                    if available_urls:
-                        urls_to_add = st.multiselect(
-                            f"Sélectionnez des URLs à ajouter ({len(available_urls)} disponibles)",
-                            options=available_urls[:100],
-                            key=f"add_urls_{cat_name}"
-                        )
-                        
-                        if urls_to_add and st.button(f"➕ Ajouter {len(urls_to_add)} URL(s)", key=f"add_btn_{cat_name}"):
-                            st.session_state.categories_custom[cat_name].extend(urls_to_add)
-                            st.success(f"{len(urls_to_add)} URL(s) ajoutée(s) à '{cat_name}'")
-                            st.rerun()
-                    else:
-                        st.info("Toutes les URLs sont déjà dans une catégorie ou aucune ne correspond à la recherche")
+                render_category_editor(cat_name)
     
     with tab_create:
         st.markdown("### Créer une nouvelle catégorie")
@@ -304,14 +454,14 @@ if st.session_state.scan_done:
             help="Toutes les URLs contenant ce texte seront ajoutées"
         )
         
+        # Correspondances calculées une seule fois : réutilisées pour l'aperçu et la création
+        matching_urls = search_urls(pattern) if pattern else []
         if pattern:
-            matching_urls = [u for u in st.session_state.all_urls if pattern.lower() in u.lower()]
             st.info(f"✅ {len(matching_urls)} URLs correspondent au pattern '{pattern}'")
             
             if matching_urls:
                 with st.expander("Voir les URLs correspondantes", expanded=False):
-                    for url in matching_urls[:20]:
-                        st.code(url, language=None)
+                    st.code("\n".join(matching_urls[:20]), language=None)
                     if len(matching_urls) > 20:
                         st.caption(f"... et {len(matching_urls) - 20} autres")
         
@@ -333,12 +483,12 @@ if st.session_state.scan_done:
                 # Combiner pattern + manuel
                 urls_to_add = []
                 if pattern:
-                    urls_to_add.extend([u for u in st.session_state.all_urls if pattern.lower() in u.lower()])
+                    urls_to_add.extend(matching_urls)
                 if manual_urls:
                     urls_to_add.extend(manual_urls)
                 
-                # Dédupliquer
-                urls_to_add = list(set(urls_to_add))
+                # Dédupliquer en conservant l'ordre
+                urls_to_add = list(dict.fromkeys(urls_to_add))
                 
                 if urls_to_add:
                     st.session_state.categories_custom[new_cat_name] = urls_to_add
@@ -357,11 +507,13 @@ if st.session_state.scan_done:
                 "categories": st.session_state.categories_custom,
                 "total_urls": len(st.session_state.all_urls)
             }
-            json_str = json.dumps(export_data, indent=2, ensure_ascii=False)
+            # Sérialisation directe en octets UTF-8, sans passer par une grande chaîne intermédiaire
+            json_buffer = BytesIO()
+            json.dump(export_data, codecs.getwriter("utf-8")(json_buffer), indent=2, ensure_ascii=False)
             
             st.download_button(
                 label="💾 Télécharger les catégories (JSON)",
-                data=json_str,
+                data=json_buffer.getvalue(),
                 file_name="categories_geo.json",
                 mime="application/json"
             )
@@ -427,7 +579,7 @@ if st.session_state.scan_done and st.session_state.categories_custom:
                 for cat in selected_categories:
                     st.markdown(f"### 📁 {cat}")
                     urls_cat = st.session_state.categories_custom[cat][:max_pages]
-                    for url in urls_cat[:10]:
-                        st.code(url, language=None)
+                    if urls_cat:
+                        st.code("\n".join(urls_cat[:10]), language=None)
                     if len(urls_cat) > 10:
                         st.caption(f"... et {len(urls_cat) - 10} autres URLs")